@@ -2,8 +2,10 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from tools.stock_data import get_stock_news, get_stock_report, get_board_news
+from tools.llm_cache import cached_llm_invoke, store_llm_result, source_version
 from state import AgentState
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 def news_agent_node(state: AgentState):
     """
@@ -25,8 +27,12 @@ def news_agent_node(state: AgentState):
         financial_news = get_board_news(stock_name, sector_type)
         profit_forecast = [] # 板块没有个股盈利预测
     else:
-        financial_news = get_stock_news(stock_code)
-        profit_forecast = get_stock_report(stock_code)
+        # 新闻与研报互不依赖，并发获取
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            news_future = executor.submit(get_stock_news, stock_code)
+            report_future = executor.submit(get_stock_report, stock_code)
+            financial_news = news_future.result()
+            profit_forecast = report_future.result()
     
     # 从 state 中获取独立配置
     config = state.get("config", {})
@@ -103,7 +109,9 @@ def news_agent_node(state: AgentState):
     )
     
     try:
-        raw_res = llm.invoke(prompt_str)
+        version = source_version(__name__)
+        # 解析成功后才写入缓存
+        raw_res = cached_llm_invoke("资讯侦察兵", llm, prompt_str, llm_kwargs, version=version, store=False)
         
         # 提取思考过程 (针对 DeepSeek 等模型)
         reasoning = raw_res.additional_kwargs.get("reasoning_content", "")
@@ -137,6 +145,9 @@ def news_agent_node(state: AgentState):
             sentiment_score = 0.0
             parse_success = False
 
+        if parse_success:
+            store_llm_result("资讯侦察兵", prompt_str, llm_kwargs, raw_res, version)
+
         return {
             "news_analysis": analysis,
             "sentiment_score": sentiment_score,
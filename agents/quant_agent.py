@@ -1,27 +1,43 @@
 from tools.stock_data import get_stock_hist_data, get_stock_financial_indicator, get_stock_fund_flow, get_stock_industry_comparison, get_board_hist_data
 from state import AgentState
 import pandas as pd
+import numpy as np
+import traceback
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from backtest.data import DataManager
 from backtest.strategy import STRATEGY_REGISTRY
 from backtest.engine import VectorizedEngine
-from backtest.analytics import PerformanceAnalytics
+from backtest.analytics import calculate_metrics, get_summary_report
 from backtest.persistence import BacktestPersistence
 
-def quant_agent_node(state: AgentState):
+def _ma_5_10_20_60(close: np.ndarray):
     """
-    数据分析师：负责获取 K 线数据、财务指标及资金流向，并运行量化回测。
+    计算 5/10/20/60 日均线的最新值
+    只取最近 60 个收盘价做四次切片求均值，历史不足的周期返回 NaN (与 rolling 结果一致)
     """
-    stock_code = state["stock_code"]
-    stock_name = state["stock_name"]
-    is_sector = state.get("is_sector", False)
-    
-    # 检查是否有错误或中断信号
-    if state.get("error") or state.get("interrupted"):
-        return {"messages": []}
-    
-    print(f"--- 📊 数据分析师: 正在分析 {stock_name}({stock_code}) 的量化数据 ---")
-    
-    # 1. 获取历史数据 (使用新的 DataManager 以统一 Schema)
+    tail = close[-60:]
+    return tuple(tail[-n:].mean() if len(tail) >= n else np.nan for n in (5, 10, 20, 60))
+
+@lru_cache(maxsize=1)
+def _backtest_pipeline():
+    """
+    回测所需的引擎、持久化对象与策略实例只构建一次，各次分析复用
+    策略无内部状态，默认参数在构建时即导出，实例化失败的策略在此处提示并跳过
+    """
+    engine = VectorizedEngine()
+    persistence = BacktestPersistence()
+    strategies = []
+    for name, strategy_cls in STRATEGY_REGISTRY.items():
+        try:
+            strategy = strategy_cls()
+            strategies.append((name, strategy, strategy.params.model_dump()))
+        except Exception as e:
+            print(f"策略 {name} 初始化失败: {e}")
+    return engine, persistence, tuple(strategies)
+
+def _load_history(stock_code: str, stock_name: str, is_sector: bool, sector_type: str) -> pd.DataFrame:
+    """1. 获取历史数据 (使用新的 DataManager 以统一 Schema)"""
     try:
         data_manager = DataManager()
         # 统一获取最近一年的数据进行回测，并包含财务与估值指标以支持复杂策略
@@ -29,80 +45,117 @@ def quant_agent_node(state: AgentState):
         
         if df.empty and is_sector:
              # 如果是板块，回退到原有逻辑获取数据
-             df = get_board_hist_data(stock_name, board_type=state.get("sector_type", "industry"), days=252)
+             df = get_board_hist_data(stock_name, board_type=sector_type, days=252)
              # 手动转换 schema
              df = df.rename(columns={"日期": "dt", "开盘": "open", "最高": "high", "最低": "low", "收盘": "close", "成交量": "volume"})
              df["dt"] = pd.to_datetime(df["dt"])
              df["adj_close"] = df["close"]
-        
-        # 检查是否有错误或中断信号
-        if state.get("error") or state.get("interrupted"):
-            return {"messages": []}
+        return df
     except Exception as e:
         print(f"获取历史数据失败: {e}")
-        df = pd.DataFrame()
+        return pd.DataFrame()
 
-    # 板块分析跳过财务指标和资金流向排名（因为是整体分析）
-    financials = {}
-    fund_flow = {}
-    industry_data = {}
-    
-    if not is_sector:
-        # 2. 获取财务指标
-        try:
-            financials = get_stock_financial_indicator(stock_code)
-            if not financials or "error" in financials:
-                print(f"⚠️ 财务指标获取异常，使用默认值")
-                financials = {
-                    "warning": "财务指标数据暂不可用",
-                    "数据状态": "缺失",
-                    "建议": "建议人工复核财务数据"
-                }
-        except Exception as e:
-            print(f"获取财务指标失败: {e}")
+def _fetch_financials(stock_code: str) -> dict:
+    """2. 获取财务指标"""
+    try:
+        financials = get_stock_financial_indicator(stock_code)
+        if not financials or "error" in financials:
+            print(f"⚠️ 财务指标获取异常，使用默认值")
             financials = {
-                "warning": f"获取财务指标失败: {str(e)[:50]}",
-                "数据状态": "异常",
+                "warning": "财务指标数据暂不可用",
+                "数据状态": "缺失",
                 "建议": "建议人工复核财务数据"
             }
-        
-        # 3. 获取资金流向
-        try:
-            fund_flow = get_stock_fund_flow(stock_code)
-            if not fund_flow or "error" in fund_flow:
-                print(f"⚠️ 资金流向获取异常，使用默认值")
-                fund_flow = {
-                    "代码": stock_code,
-                    "warning": "资金流向数据暂不可用",
-                    "数据状态": "缺失",
-                    "建议": "建议人工复核资金流向数据"
-                }
-        except Exception as e:
-            print(f"获取资金流向失败: {e}")
+    except Exception as e:
+        print(f"获取财务指标失败: {e}")
+        financials = {
+            "warning": f"获取财务指标失败: {str(e)[:50]}",
+            "数据状态": "异常",
+            "建议": "建议人工复核财务数据"
+        }
+    return financials
+
+def _fetch_fund_flow(stock_code: str) -> dict:
+    """3. 获取资金流向"""
+    try:
+        fund_flow = get_stock_fund_flow(stock_code)
+        if not fund_flow or "error" in fund_flow:
+            print(f"⚠️ 资金流向获取异常，使用默认值")
             fund_flow = {
                 "代码": stock_code,
-                "warning": f"获取资金流向失败: {str(e)[:50]}",
-                "数据状态": "异常",
+                "warning": "资金流向数据暂不可用",
+                "数据状态": "缺失",
                 "建议": "建议人工复核资金流向数据"
             }
-        
-        # 4. 获取行业对比数据
-        try:
-            industry_data = get_stock_industry_comparison(stock_code)
-            if not industry_data or "error" in industry_data:
-                print(f"⚠️ 行业对比数据获取异常，使用默认值")
-                industry_data = {
-                    "warning": "行业对比数据暂不可用",
-                    "数据状态": "缺失",
-                    "建议": "建议人工复核行业对比数据"
-                }
-        except Exception as e:
-            print(f"获取行业对比失败: {e}")
+    except Exception as e:
+        print(f"获取资金流向失败: {e}")
+        fund_flow = {
+            "代码": stock_code,
+            "warning": f"获取资金流向失败: {str(e)[:50]}",
+            "数据状态": "异常",
+            "建议": "建议人工复核资金流向数据"
+        }
+    return fund_flow
+
+def _fetch_industry_data(stock_code: str) -> dict:
+    """4. 获取行业对比数据"""
+    try:
+        industry_data = get_stock_industry_comparison(stock_code)
+        if not industry_data or "error" in industry_data:
+            print(f"⚠️ 行业对比数据获取异常，使用默认值")
             industry_data = {
-                "warning": f"获取行业数据失败: {str(e)[:50]}",
-                "数据状态": "异常",
+                "warning": "行业对比数据暂不可用",
+                "数据状态": "缺失",
                 "建议": "建议人工复核行业对比数据"
             }
+    except Exception as e:
+        print(f"获取行业对比失败: {e}")
+        industry_data = {
+            "warning": f"获取行业数据失败: {str(e)[:50]}",
+            "数据状态": "异常",
+            "建议": "建议人工复核行业对比数据"
+        }
+    return industry_data
+
+def quant_agent_node(state: AgentState):
+    """
+    数据分析师：负责获取 K 线数据、财务指标及资金流向，并运行量化回测。
+    """
+    stock_code = state["stock_code"]
+    stock_name = state["stock_name"]
+    is_sector = state.get("is_sector", False)
+    
+    # 检查是否有错误或中断信号
+    if state.get("error") or state.get("interrupted"):
+        return {"messages": []}
+    
+    print(f"--- 📊 数据分析师: 正在分析 {stock_name}({stock_code}) 的量化数据 ---")
+    
+    # 历史行情、财务指标、资金流向、行业对比互不依赖，并发获取以缩短等待时间
+    # 板块分析跳过财务指标和资金流向排名（因为是整体分析）
+    financials = {}
+    fund_flow = {}
+    industry_data = {}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = {
+            executor.submit(_load_history, stock_code, stock_name, is_sector, state.get("sector_type", "industry")): ("history", "历史行情")
+        }
+        if not is_sector:
+            futures[executor.submit(_fetch_financials, stock_code)] = ("financials", "财务指标")
+            futures[executor.submit(_fetch_fund_flow, stock_code)] = ("fund_flow", "资金流向")
+            futures[executor.submit(_fetch_industry_data, stock_code)] = ("industry_data", "行业对比")
+        
+        # 每完成一项即输出进度，不必等全部数据就绪
+        results = {}
+        for done, future in enumerate(as_completed(futures), 1):
+            key, label = futures[future]
+            results[key] = future.result()
+            print(f"✅ {label}获取完成 ({done}/{len(futures)})")
+    
+    df = results["history"]
+    financials = results.get("financials", financials)
+    fund_flow = results.get("fund_flow", fund_flow)
+    industry_data = results.get("industry_data", industry_data)
     
     if isinstance(df, pd.DataFrame) and not df.empty and len(df) >= 10:
         try:
@@ -110,10 +163,7 @@ def quant_agent_node(state: AgentState):
             df = df.sort_values('dt')
             
             # 1. 均线系统 (MA)
-            df["MA5"] = df["close"].rolling(window=5).mean()
-            df["MA10"] = df["close"].rolling(window=10).mean()
-            df["MA20"] = df["close"].rolling(window=20).mean()
-            df["MA60"] = df["close"].rolling(window=60).mean()
+            ma5, ma10, ma20, ma60 = _ma_5_10_20_60(df["close"].to_numpy())
             
             # 2. 指数平滑异同平均线 (MACD)
             exp1 = df["close"].ewm(span=12, adjust=False).mean()
@@ -130,10 +180,15 @@ def quant_agent_node(state: AgentState):
             df["RSI"] = 100 - (100 / (1 + rs))
             
             # 4. 布林带 (BOLL)
-            df["BOLL_MID"] = df["close"].rolling(window=20).mean()
-            df["BOLL_STD"] = df["close"].rolling(window=20).std()
-            df["BOLL_UPPER"] = df["BOLL_MID"] + 2 * df["BOLL_STD"]
-            df["BOLL_LOWER"] = df["BOLL_MID"] - 2 * df["BOLL_STD"]
+            # 只用到最新一根 K 线的布林带，直接对最近 20 个收盘价求均值与标准差
+            boll_window = df["close"].to_numpy()[-20:]
+            if len(boll_window) == 20:
+                boll_mid = boll_window.mean()
+                boll_std = boll_window.std(ddof=1)
+            else:
+                boll_mid = boll_std = np.nan
+            boll_upper = boll_mid + 2 * boll_std
+            boll_lower = boll_mid - 2 * boll_std
             
             # 5. 随机指标 (KDJ)
             low_list = df["low"].rolling(9, min_periods=9).min()
@@ -143,24 +198,28 @@ def quant_agent_node(state: AgentState):
             df["KDJ_D"] = df["KDJ_K"].ewm(com=2).mean()
             df["KDJ_J" ] = 3 * df["KDJ_K"] - 2 * df["KDJ_D"]
             
-            # 6. 成交量分析
-            df["VMA5"] = df["volume"].rolling(window=5).mean()
-            df["VMA10"] = df["volume"].rolling(window=10).mean()
-            
             # 仅对基础列填充 NaN，保留技术指标的 NaN 以避免误导形态识别
             base_cols = ["open", "close", "high", "low", "volume", "adj_close"]
             df[base_cols] = df[base_cols].fillna(0)
             
-            vma5_last = df["VMA5"].iloc[-1] if not pd.isna(df["VMA5"].iloc[-1]) else 0
-            volume_ratio = df["volume"].iloc[-1] / vma5_last if vma5_last != 0 else 1
+            # 6. 成交量分析 (只需最近 5 日均量，直接在 ndarray 视图上切片求均值)
+            vol = df["volume"].to_numpy()
+            avg_vol = vol[-5:].mean()
+            volume_ratio = vol[-1] / avg_vol if avg_vol != 0 else 1
             
             # 7. 技术形态识别 (指标 + K线形态)
-            last_row = df.iloc[-1]
-            prev_row = df.iloc[-2]
+            # 按位置一次性取出最近两根 K 线所需字段，避免构造整行 Series 后再逐个按标签查找
+            row_cols = ["open", "high", "low", "close", "volume",
+                        "MACD", "Signal", "Hist", "RSI",
+                        "KDJ_K", "KDJ_D", "KDJ_J"]
+            row_cols += [c for c in ("pe", "roe", "peg", "net_profit_growth") if c in df.columns]
+            prev_vals, last_vals = df.iloc[-2:][row_cols].to_numpy()
+            prev_row = dict(zip(row_cols, prev_vals))
+            last_row = dict(zip(row_cols, last_vals))
             
             patterns = []
             # --- 指标类形态 ---
-            if last_row["MA5"] > last_row["MA10"] > last_row["MA20"]:
+            if ma5 > ma10 > ma20:
                 patterns.append("均线多头排列")
             if prev_row["MACD"] < prev_row["Signal"] and last_row["MACD"] > last_row["Signal"]:
                 patterns.append("MACD 金叉")
@@ -169,8 +228,8 @@ def quant_agent_node(state: AgentState):
             if last_row["RSI"] > 75: patterns.append("RSI 超买 (警惕回调)")
             elif last_row["RSI"] < 25: patterns.append("RSI 超跌 (存在反弹需求)")
             
-            if last_row["close"] > last_row["BOLL_UPPER"]: patterns.append("布林带上轨压力")
-            elif last_row["close"] < last_row["BOLL_LOWER"]: patterns.append("布林带下轨支撑")
+            if last_row["close"] > boll_upper: patterns.append("布林带上轨压力")
+            elif last_row["close"] < boll_lower: patterns.append("布林带下轨支撑")
 
             # --- 经典 K 线形态 (基于最近两根蜡烛) ---
             body = last_row["close"] - last_row["open"]
@@ -208,7 +267,6 @@ def quant_agent_node(state: AgentState):
             # 计算 OBV (能量潮指标)
             df["OBV"] = (df["volume"] * ((df["close"] > df["close"].shift(1)).astype(int) * 2 - 1)).fillna(0).cumsum()
 
-            avg_vol = df["volume"].tail(5).mean()
             price_change = (last_row["close"] - prev_row["close"]) / prev_row["close"]
             vol_change = (last_row["volume"] - prev_row["volume"]) / prev_row["volume"]
 
@@ -235,10 +293,10 @@ def quant_agent_node(state: AgentState):
             tech_indicators = {
                 "latest_price": clean_value(latest_price, "现价"),
                 "ma_system": {
-                    "ma5": clean_value(last_row["MA5"], "5日均线"),
-                    "ma10": clean_value(last_row["MA10"], "10日均线"),
-                    "ma20": clean_value(last_row["MA20"], "20日均线"),
-                    "ma60": clean_value(last_row["MA60"], "60日均线")
+                    "ma5": clean_value(ma5, "5日均线"),
+                    "ma10": clean_value(ma10, "10日均线"),
+                    "ma20": clean_value(ma20, "20日均线"),
+                    "ma60": clean_value(ma60, "60日均线")
                 },
                 "macd": {
                     "diff": clean_value(last_row["MACD"], "MACD_DIF(12,26)"),
@@ -252,9 +310,9 @@ def quant_agent_node(state: AgentState):
                     "j": clean_value(last_row["KDJ_J"], "KDJ_J(9日)")
                 },
                 "boll": {
-                    "upper": clean_value(last_row["BOLL_UPPER"], "BOLL上轨(20日,2σ)"),
-                    "mid": clean_value(last_row["BOLL_MID"], "BOLL中轨(20日)"),
-                    "lower": clean_value(last_row["BOLL_LOWER"], "BOLL下轨(20日,2σ)")
+                    "upper": clean_value(boll_upper, "BOLL上轨(20日,2σ)"),
+                    "mid": clean_value(boll_mid, "BOLL中轨(20日)"),
+                    "lower": clean_value(boll_lower, "BOLL下轨(20日,2σ)")
                 },
                 "fundamental": {
                     "pe": clean_value(last_row.get("pe"), "PE(静)"),
@@ -269,26 +327,42 @@ def quant_agent_node(state: AgentState):
             # 9. 运行量化回测 (核心升级：不再只选一个最好，而是给出候选集)
             print(f"--- 🔄 正在运行量化策略候选回测 --- ")
             backtest_results = []
-            engine = VectorizedEngine()
-            persistence = BacktestPersistence()
+            engine, persistence, strategy_pipeline = _backtest_pipeline()
+            # 所有策略共享同一份日收益率，避免每个策略重复计算 pct_change
+            daily_returns = engine.daily_returns(df)
             
-            for name, strategy_cls in STRATEGY_REGISTRY.items():
+            # 先逐个生成信号，再由引擎对全部策略做一次矩阵化回测
+            strategy_params = {}
+            signals = {}
+            for name, strategy, params in strategy_pipeline:
                 try:
-                    strategy = strategy_cls()
-                    run_results = engine.run(strategy, df)
-                    metrics = PerformanceAnalytics.calculate_metrics(run_results)
-                    
-                    # 保存回测记录
-                    persistence.save_result(name, strategy.params.model_dump(), metrics, 
-                                          {"symbol": stock_code, "data_len": len(df)})
+                    # 在单个策略内完成对齐与数值校验，长度或类型不合法只影响该策略，不会拖垮整批回测
+                    signals[name] = pd.Series(strategy.generate_signals(df), index=df.index).astype(float)
+                    strategy_params[name] = params
+                except Exception as e:
+                    print(f"策略 {name} 回测失败: {e}")
+            
+            batch_results = engine.run_batch(signals, df, returns=daily_returns)
+            
+            saved_runs = []
+            for name, run_results in batch_results.items():
+                try:
+                    metrics = calculate_metrics(run_results)
+                    saved_runs.append((name, strategy_params[name], metrics))
                     
                     backtest_results.append({
                         "name": name,
                         "metrics": metrics,
-                        "summary": PerformanceAnalytics.get_summary_report(metrics)
+                        "summary": get_summary_report(metrics)
                     })
                 except Exception as e:
                     print(f"策略 {name} 回测失败: {e}")
+            
+            # 保存回测记录：本次全部策略合并写入一个文件
+            try:
+                persistence.save_results(saved_runs, {"symbol": stock_code, "data_len": len(df)})
+            except Exception as e:
+                print(f"⚠️ 保存回测记录失败: {e}")
 
             # 按夏普比率排序
             backtest_results = sorted(backtest_results, key=lambda x: x["metrics"].get("sharpe", 0), reverse=True)
@@ -310,9 +384,8 @@ def quant_agent_node(state: AgentState):
             }
             
         except Exception as e:
-            import traceback
             print(f"量化分析过程出错: {e}")
-            print(traceback.format_exc())
+            traceback.print_exc()
             return {"error": f"量化分析失败: {str(e)}"}
     else:
         return {"error": "获取到的数据不足以进行量化分析"}
@@ -1,6 +1,7 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from tools.llm_cache import cached_llm_invoke, store_llm_result, source_version
 from state import AgentState
 import os
 from datetime import datetime
@@ -162,7 +163,9 @@ def risk_agent_node(state: AgentState):
             format_instructions=parser.get_format_instructions()
         )
         
-        raw_res = llm.invoke(prompt_str)
+        version = source_version(__name__)
+        # 只缓存能按标准 JSON 解析的回复，回退解析得到的结果不写入缓存
+        raw_res = cached_llm_invoke("风控官", llm, prompt_str, llm_kwargs, version=version, store=False)
         
         # 提取思考过程 (针对 DeepSeek 等模型)
         reasoning = raw_res.additional_kwargs.get("reasoning_content", "")
@@ -170,6 +173,8 @@ def risk_agent_node(state: AgentState):
         # 解析结果
         try:
             result = parser.parse(raw_res.content)
+            if isinstance(result, dict) and "decision" in result:
+                store_llm_result("风控官", prompt_str, llm_kwargs, raw_res, version)
         except Exception as pe:
             print(f"JSON 解析失败，尝试回退解析: {pe}")
             result = parse_risk_assessment_with_fallback(raw_res.content)
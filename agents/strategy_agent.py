@@ -1,5 +1,6 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from tools.llm_cache import cached_llm_invoke, source_version
 from state import AgentState
 import os
 from datetime import datetime
@@ -313,15 +314,16 @@ def strategy_agent_node(state: AgentState):
         # 如果 quant_data 本身也包含它，模板中 {{quant_data}} 会很大
         display_quant_data = {k: v for k, v in quant_data.items() if k != "backtest_candidates"}
 
-        chain = prompt | llm
-        res = chain.invoke({
+        # 模板只有一条用户消息，取出其文本直接调用模型，与 prompt | llm 发送的内容一致
+        prompt_str = prompt.format_messages(**{
             "news_analysis": news_analysis,
             "sentiment_score": sentiment_score,
             "quant_data": display_quant_data,
             "tech_indicators": state.get("technical_indicators", {}),
             "backtest_candidates": backtest_candidates,
             "sector_cons": state.get("sector_cons", [])[:10] if is_sector else []
-        })
+        })[0].content
+        res = cached_llm_invoke("策略主理人", llm, prompt_str, llm_kwargs, version=source_version(__name__))
         
         # 提取思考过程
         reasoning = res.additional_kwargs.get("reasoning_content", "")
@@ -1,11 +1,11 @@
 import streamlit as st
 import pandas as pd
 import os
-import json
+import orjson
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from graph import create_alpha_flow_graph
-from tools.stock_data import search_stock_code, get_stock_hist_data, search_board_info, get_board_hist_data, get_board_cons, get_cache_status
+from tools.stock_data import search_stock_code, get_stock_hist_data, search_board_info, get_board_hist_data, get_board_cons, get_cache_status, prefetch_stock_data
 import plotly.graph_objects as go
 from pathlib import Path
 
@@ -32,8 +32,8 @@ def load_model_cache():
         if not MODEL_CACHE_FILE.exists():
             return None
         
-        with open(MODEL_CACHE_FILE, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
+        with open(MODEL_CACHE_FILE, 'rb') as f:
+            cache_data = orjson.loads(f.read())
         
         # 检查缓存是否过期（24小时）
         cache_time = datetime.fromisoformat(cache_data.get("cache_time", ""))
@@ -53,8 +53,8 @@ def save_model_cache(model_name: str):
             "model_name": model_name,
             "cache_time": datetime.now().isoformat()
         }
-        with open(MODEL_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        with open(MODEL_CACHE_FILE, 'wb') as f:
+            f.write(orjson.dumps(cache_data, option=orjson.OPT_INDENT_2))
     except Exception as e:
         pass
 
@@ -72,8 +72,8 @@ def save_history(stock_name, stock_code, report):
         "stock_code": stock_code,
         "report": report
     }
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with open(filepath, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
 def get_history_list():
     if not os.path.exists(HISTORY_DIR):
@@ -98,8 +98,6 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "workflow_state" not in st.session_state:
     st.session_state.workflow_state = None
-if "app" not in st.session_state:
-    st.session_state.app = create_alpha_flow_graph()
 if "current_stock" not in st.session_state:
     st.session_state.current_stock = None
 
@@ -122,8 +120,8 @@ with st.sidebar:
             
             for h_file in history_files[:20]: # 显示最近20个
                 try:
-                    with open(os.path.join(HISTORY_DIR, h_file), "r", encoding="utf-8") as f:
-                        h_data = json.load(f)
+                    with open(os.path.join(HISTORY_DIR, h_file), "rb") as f:
+                        h_data = orjson.loads(f.read())
                         
                         col1, col2 = st.columns([0.8, 0.2])
                         with col1:
@@ -423,6 +421,8 @@ def run_workflow(input_str, config_params):
             return
             
         st.session_state.current_stock = {"code": stock_code, "name": stock_name, "is_sector": is_sector}
+        # 后台预取各节点会用到的数据，与工作流初始化并行
+        prefetch_stock_data(stock_code, stock_name, is_sector, sector_type)
         type_str = "板块" if is_sector else "股票"
         status.update(label=f"✅ 已找到{type_str}: {stock_name} ({stock_code})", state="complete")
 
@@ -457,9 +457,9 @@ def run_workflow(input_str, config_params):
         try:
             # 使用 stream 模式来捕获节点切换
             final_state = initial_state
-            for output in st.session_state.app.stream(initial_state):
+            for output in create_alpha_flow_graph().stream(initial_state):
                 for node_name, state_update in output.items():
-                    final_state.update(state_update)
+                    final_state.update(state_update or {})
                     
                     if node_name == "supervisor":
                         st.write("🚀 **调度员**: 任务分发中...")
@@ -8,22 +8,27 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 from functools import wraps
 import time
+import random
 
-def retry(max_retries=3, delay=1, backoff=2):
+def retry(max_retries=3, delay=1, backoff=2, max_delay=10, max_total_delay=30):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             retries = 0
             current_delay = delay
+            total_delay = 0.0
             while retries < max_retries:
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
                     retries += 1
-                    if retries == max_retries:
+                    # Exponential backoff with jitter, capped per attempt and in total
+                    sleep_time = current_delay * (0.5 + random.random())
+                    if retries == max_retries or total_delay + sleep_time > max_total_delay:
                         raise e
-                    time.sleep(current_delay)
-                    current_delay *= backoff
+                    time.sleep(sleep_time)
+                    total_delay += sleep_time
+                    current_delay = min(current_delay * backoff, max_delay)
             return None
         return wrapper
     return decorator
@@ -186,6 +191,19 @@ class DataManager:
         except:
             return None
 
+    def _parse_chinese_num_series(self, series: pd.Series) -> pd.Series:
+        """Column-wise _parse_chinese_num: unparsable cells are coerced to NaN instead of raising per cell"""
+        is_str = series.map(lambda v: isinstance(v, str))
+        text = series.where(is_str).astype("string").str.strip()
+        multiplier = np.select(
+            [text.str.endswith("%", na=False), text.str.endswith("亿", na=False), text.str.endswith("万", na=False)],
+            [0.01, 1e8, 1e4],
+            default=1.0,
+        )
+        parsed = pd.to_numeric(text.str.replace(r"[%亿万]$", "", regex=True), errors="coerce").astype(float) * multiplier
+        numeric = pd.to_numeric(series.where(~is_str), errors="coerce")
+        return parsed.where(is_str, numeric)
+
     def add_fundamental_indicators(self, symbol: str, df: pd.DataFrame) -> pd.DataFrame:
         """Add PE, PB, ROE etc. to the price dataframe with fallback mechanism"""
         try:
@@ -212,7 +230,7 @@ class DataManager:
                 # Convert strings to numbers
                 for col in ["net_profit", "net_profit_growth", "revenue", "revenue_growth", "bps", "roe", "eps", "gross_margin", "debt_to_assets", "ocf_ps", "receivables_days"]:
                     if col in fin_df.columns:
-                        fin_df[col] = fin_df[col].apply(self._parse_chinese_num)
+                        fin_df[col] = self._parse_chinese_num_series(fin_df[col])
                 
                 # Sort by date
                 fin_df = fin_df.sort_values("report_date")
@@ -13,10 +13,12 @@ class VectorizedEngine:
         self.commission = commission
         self.slippage = slippage
 
-    def run(self, strategy: BaseStrategy, df: pd.DataFrame) -> pd.DataFrame:
+    def run(self, strategy: BaseStrategy, df: pd.DataFrame, returns: Optional[pd.Series] = None) -> pd.DataFrame:
         """
         Run the backtest.
         Returns a result DataFrame with daily returns, positions, and equity curve.
+        `returns` may carry precomputed close-to-close returns for `df` so that
+        callers running many strategies on the same data compute them only once.
         """
         if df.empty:
             return pd.DataFrame()
@@ -29,7 +31,7 @@ class VectorizedEngine:
         
         # 2. Calculate daily returns
         # close_to_close returns
-        daily_returns = df["close"].pct_change().fillna(0)
+        daily_returns = returns if returns is not None else self.daily_returns(df)
         
         # 3. Apply positions (shift positions by 1 to avoid look-ahead bias)
         # The position at day t determines the return from t to t+1
@@ -60,3 +62,51 @@ class VectorizedEngine:
         results["drawdown"] = (equity_curve / equity_curve.cummax()) - 1
         
         return results
+
+    def run_batch(self, signals: Dict[str, pd.Series], df: pd.DataFrame,
+                  returns: Optional[pd.Series] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Run the backtest for many strategies on the same data in one pass.
+        `signals` maps strategy name to the output of its generate_signals(df).
+        Signals are stacked into a (days, strategies) matrix so costs, equity and
+        drawdown are computed once for all strategies. Result frames only carry
+        `dt` (when present) and the backtest columns, not a copy of `df`.
+        """
+        if df.empty or not signals:
+            return {}
+
+        daily_returns = returns if returns is not None else self.daily_returns(df)
+
+        # (T, N) signal matrix aligned on the data index
+        signal_frame = pd.DataFrame(signals, index=df.index)
+        raw_signals = signal_frame.to_numpy(dtype=float)
+
+        # Shift positions by 1 day to avoid look-ahead bias
+        positions = np.zeros_like(raw_signals)
+        positions[1:] = raw_signals[:-1]
+        positions = np.nan_to_num(positions, nan=0.0)
+
+        gross_returns = positions * daily_returns.to_numpy(dtype=float)[:, None]
+        trades = np.abs(np.diff(positions, axis=0, prepend=positions[:1]))
+        net_returns = gross_returns - trades * (self.commission + self.slippage)
+
+        equity_curve = np.cumprod(1 + net_returns, axis=0) * self.initial_cash
+        drawdown = equity_curve / np.maximum.accumulate(equity_curve, axis=0) - 1
+
+        base = {"dt": df["dt"].to_numpy()} if "dt" in df.columns else {}
+        results = {}
+        for j, name in enumerate(signal_frame.columns):
+            results[name] = pd.DataFrame({
+                **base,
+                "signal": raw_signals[:, j],
+                "position": positions[:, j],
+                "daily_return": net_returns[:, j],
+                "equity": equity_curve[:, j],
+                "drawdown": drawdown[:, j],
+            }, index=df.index)
+        return results
+
+    @staticmethod
+    def daily_returns(df: pd.DataFrame) -> pd.Series:
+        """Close-to-close returns shared by every strategy run on the same data"""
+        return df["close"].pct_change().fillna(0)
@@ -1,8 +1,15 @@
-import json
+import orjson
 import os
 import hashlib
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+# Metrics are often numpy scalars; orjson serializes them natively
+_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+
+def _dumps_sorted(obj: Any) -> bytes:
+    """Canonical JSON bytes used to derive run ids"""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
 
 class BacktestPersistence:
     """
@@ -23,8 +30,8 @@ class BacktestPersistence:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Create a unique ID for this backtest run
-        id_str = f"{strategy_name}_{json.dumps(params, sort_keys=True)}_{json.dumps(data_info, sort_keys=True)}"
-        run_id = hashlib.md5(id_str.encode()).hexdigest()[:8]
+        id_bytes = b"_".join([strategy_name.encode(), _dumps_sorted(params), _dumps_sorted(data_info)])
+        run_id = hashlib.md5(id_bytes).hexdigest()[:8]
         
         filename = f"{strategy_name}_{timestamp}_{run_id}.json"
         filepath = os.path.join(self.storage_dir, filename)
@@ -38,18 +45,52 @@ class BacktestPersistence:
             "metrics": metrics
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(record, f, indent=4, ensure_ascii=False)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(record, option=_JSON_OPTIONS))
+            
+        return filepath
+
+    def save_results(self, runs: List[Tuple[str, Dict[str, Any], Dict[str, Any]]],
+                     data_info: Dict[str, Any]) -> Optional[str]:
+        """
+        Save a batch of (strategy_name, params, metrics) results sharing the same data
+        into a single JSON file, instead of one file per strategy.
+        Returns the path to the saved file, or None if there is nothing to save.
+        """
+        if not runs:
+            return None
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        data_info_bytes = _dumps_sorted(data_info)
+        
+        records = []
+        for strategy_name, params, metrics in runs:
+            id_bytes = b"_".join([strategy_name.encode(), _dumps_sorted(params), data_info_bytes])
+            records.append({
+                "run_id": hashlib.md5(id_bytes).hexdigest()[:8],
+                "timestamp": timestamp,
+                "strategy": strategy_name,
+                "parameters": params,
+                "data_info": data_info,
+                "metrics": metrics
+            })
+        
+        batch_id = hashlib.md5("".join(r["run_id"] for r in records).encode()).hexdigest()[:8]
+        filepath = os.path.join(self.storage_dir, f"batch_{timestamp}_{batch_id}.json")
+        
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(records, option=_JSON_OPTIONS))
             
         return filepath
 
     def list_results(self, strategy_name: Optional[str] = None) -> list:
-        """List all saved backtest results"""
+        """List all saved backtest results (both single-run and batch files)"""
         results = []
         for filename in os.listdir(self.storage_dir):
             if filename.endswith(".json"):
-                if strategy_name and not filename.startswith(strategy_name):
-                    continue
-                with open(os.path.join(self.storage_dir, filename), 'r', encoding='utf-8') as f:
-                    results.append(json.load(f))
+                with open(os.path.join(self.storage_dir, filename), 'rb') as f:
+                    loaded = orjson.loads(f.read())
+                records = loaded if isinstance(loaded, list) else [loaded]
+                if strategy_name:
+                    records = [r for r in records if r.get("strategy") == strategy_name]
+                results.extend(records)
         return sorted(results, key=lambda x: x["timestamp"], reverse=True)
@@ -1,11 +1,52 @@
+import asyncio
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Dict, Tuple
+import orjson
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from state import AgentState
 from agents.news_agent import news_agent_node
 from agents.quant_agent import quant_agent_node
 from agents.strategy_agent import strategy_agent_node
 from agents.risk_agent import risk_agent_node
 
+# 调度节点（作为入口实现并行）
+def supervisor_node(state: AgentState):
+    print("--- 🚀 调度员: 任务并行分发中 ---")
+    # 只返回变更的字段：调度员不修改状态。返回整个 state 会重写所有字段，
+    # 带 operator.add 的 messages / reasoning_content 还会被重复追加一遍
+    return {}
+
+# 通过 Send 将同一份状态分发给资讯与量化节点，两者在同一步内并行执行
+def fan_out(state: AgentState):
+    return [Send("news_node", state), Send("quant_node", state)]
+
+# 汇合节点：等待资讯与量化节点都完成后再统一路由，不修改状态
+def analysis_join_node(state: AgentState):
+    return {}
+
+# 路由函数与目标映射在模块级定义一次，各次构图共享
+# 在汇合节点后判断：任一分析节点已报错时直接结束，跳过策略与风控节点
+def after_analysis(state: AgentState):
+    return END if state.get("error") else "strategy_node"
+
+# 风险审核后的跳转
+def after_risk_check(state: AgentState):
+    if state.get("revision_needed"):
+        print("--- 🔄 风险审核未通过，返回策略层重新思考 ---")
+        return "strategy_node"
+    return END
+
+STRATEGY_OR_END = {"strategy_node": "strategy_node", END: END}
+
+@lru_cache(maxsize=1)
 def create_alpha_flow_graph():
+    """
+    构建并编译工作流图
+    编译结果不持有任何运行状态 (未挂载 checkpointer)，进程内只编译一次，所有会话/请求共享
+    """
     # 初始化状态图
     workflow = StateGraph(AgentState)
     
@@ -14,39 +55,69 @@ def create_alpha_flow_graph():
     workflow.add_node("quant_node", quant_agent_node)
     workflow.add_node("strategy_node", strategy_agent_node)
     workflow.add_node("risk_node", risk_agent_node)
-    
-    # 调度节点（作为入口实现并行）
-    def supervisor_node(state: AgentState):
-        print("--- 🚀 调度员: 任务并行分发中 ---")
-        return state
-
     workflow.add_node("supervisor", supervisor_node)
+    workflow.add_node("analysis_join", analysis_join_node)
     workflow.set_entry_point("supervisor")
     
     # 构建边
-    workflow.add_edge("supervisor", "news_node")
-    workflow.add_edge("supervisor", "quant_node")
-    
-    # 并行节点汇聚到 strategy_node
-    workflow.add_edge("news_node", "strategy_node")
-    workflow.add_edge("quant_node", "strategy_node")
-    
+    workflow.add_conditional_edges("supervisor", fan_out, ["news_node", "quant_node"])
+    # 两个分析分支各自的路由只能看到本分支的写入，因此先汇合，再基于合并后的状态判断
+    workflow.add_edge(["news_node", "quant_node"], "analysis_join")
+    workflow.add_conditional_edges("analysis_join", after_analysis, STRATEGY_OR_END)
     workflow.add_edge("strategy_node", "risk_node")
-    
-    # 风险审核后的跳转
-    def after_risk_check(state: AgentState):
-        if state.get("revision_needed"):
-            print("--- 🔄 风险审核未通过，返回策略层重新思考 ---")
-            return "strategy_node"
-        return END
-    
-    workflow.add_conditional_edges(
-        "risk_node",
-        after_risk_check,
-        {
-            "strategy_node": "strategy_node",
-            END: END
-        }
-    )
+    workflow.add_conditional_edges("risk_node", after_risk_check, STRATEGY_OR_END)
     
     return workflow.compile()
+
+# 正在执行中的工作流任务：相同标的的并发请求复用同一次运行
+# Task 只能在创建它的事件循环中等待，因此按事件循环分组；不同线程各自 asyncio.run 时互不干扰
+_inflight_runs: Dict[asyncio.AbstractEventLoop, Dict[Tuple, "asyncio.Task"]] = {}
+_inflight_lock = threading.Lock()
+
+def _run_key(state: AgentState) -> Tuple:
+    is_sector = state.get("is_sector", False)
+    # 整个 config (API 地址、密钥、模型与采样参数) 都参与摘要，只有配置完全相同的请求才共享结果；
+    # 密钥只以摘要形式出现在键中
+    config_digest = hashlib.blake2b(
+        orjson.dumps(state.get("config", {}), option=orjson.OPT_SORT_KEYS, default=str),
+        digest_size=16
+    ).hexdigest()
+    return (
+        is_sector,
+        state.get("sector_type", "") if is_sector else "",
+        state.get("stock_code", ""),
+        config_digest,
+    )
+
+def _forget_run(loop: asyncio.AbstractEventLoop, key: Tuple):
+    with _inflight_lock:
+        runs = _inflight_runs.get(loop)
+        if runs is None:
+            return
+        runs.pop(key, None)
+        if not runs:
+            del _inflight_runs[loop]
+
+async def arun_alpha_flow(initial_state: AgentState) -> AgentState:
+    """
+    异步运行完整工作流，供已处于事件循环中的调用方使用 (Web 服务等)，不阻塞事件循环
+    同步节点由 LangGraph 放入线程池执行，资讯与量化节点仍并行
+    同一事件循环内，同一标的 (分析类型 + 代码 + 完整配置) 已在运行时，后来的调用直接等待并共享那次的结果
+    """
+    key = _run_key(initial_state)
+    loop = asyncio.get_running_loop()
+    with _inflight_lock:
+        runs = _inflight_runs.setdefault(loop, {})
+        task = runs.get(key)
+        if task is None:
+            task = loop.create_task(create_alpha_flow_graph().ainvoke(initial_state))
+            runs[key] = task
+            task.add_done_callback(lambda _: _forget_run(loop, key))
+            shared = False
+        else:
+            shared = True
+    if shared:
+        print(f"--- ♻️ {key[2]} 的分析正在进行中，等待复用其结果 ---")
+    # shield：某个调用方被取消时不影响其他等待同一任务的调用方
+    result = await asyncio.shield(task)
+    return dict(result)
@@ -1,9 +1,9 @@
 from graph import create_alpha_flow_graph
-from tools.stock_data import search_stock_code, get_cache_status
+from tools.stock_data import search_stock_code, get_cache_status, prefetch_stock_data
 from dotenv import load_dotenv
 import os
 import sys
-import json
+import orjson
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -44,8 +44,8 @@ def load_model_cache():
         if not MODEL_CACHE_FILE.exists():
             return None
         
-        with open(MODEL_CACHE_FILE, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
+        with open(MODEL_CACHE_FILE, 'rb') as f:
+            cache_data = orjson.loads(f.read())
         
         # 检查缓存是否过期（24小时）
         cache_time = datetime.fromisoformat(cache_data.get("cache_time", ""))
@@ -68,8 +68,8 @@ def save_model_cache(model_name: str):
             "model_name": model_name,
             "cache_time": datetime.now().isoformat()
         }
-        with open(MODEL_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        with open(MODEL_CACHE_FILE, 'wb') as f:
+            f.write(orjson.dumps(cache_data, option=orjson.OPT_INDENT_2))
         print(f"💾 模型探测结果已缓存: {model_name}")
     except Exception as e:
         print(f"⚠️ 保存模型缓存失败: {e}")
@@ -142,6 +142,21 @@ def run_alpha_flow(input_str: str):
         print("⚠️ 错误: 请在 .env 文件中配置有效的 OPENAI_API_KEY")
         return
 
+    # 识别输入是代码还是名称
+    stock_code = ""
+    stock_name = ""
+    
+    if input_str.isdigit() and len(input_str) == 6:
+        stock_code = input_str
+        stock_name = input_str # 稍后可以在节点中进一步完善
+    else:
+        print(f"🔍 正在搜索股票代码: {input_str}...")
+        stock_code, stock_name = search_stock_code(input_str)
+        if not stock_code:
+            print(f"❌ 未找到匹配的股票: {input_str}")
+            return
+        print(f"✅ 已找到: {stock_name} ({stock_code})")
+    
     # 模型可用性预检
     print(f"\n🧪 模型可用性预检...")
     
@@ -183,20 +198,9 @@ def run_alpha_flow(input_str: str):
     model_name = available_model
     print(f"✅ 使用模型: {model_name}\n")
 
-    # 识别输入是代码还是名称
-    stock_code = ""
-    stock_name = ""
-    
-    if input_str.isdigit() and len(input_str) == 6:
-        stock_code = input_str
-        stock_name = input_str # 稍后可以在节点中进一步完善
-    else:
-        print(f"🔍 正在搜索股票代码: {input_str}...")
-        stock_code, stock_name = search_stock_code(input_str)
-        if not stock_code:
-            print(f"❌ 未找到匹配的股票: {input_str}")
-            return
-        print(f"✅ 已找到: {stock_name} ({stock_code})")
+    # 预检通过后再在后台预取行情与资讯数据 (预检失败提前返回时不会留下仍在运行的后台请求)，
+    # 与工作流初始化并行，节点运行时直接命中缓存
+    prefetch_stock_data(stock_code, stock_name)
 
     # 初始化状态
     initial_state = {
@@ -237,7 +241,7 @@ def run_alpha_flow(input_str: str):
         final_state = initial_state
         for output in app.stream(initial_state):
             for node_name, state_update in output.items():
-                final_state.update(state_update)
+                final_state.update(state_update or {})
                 # 检查是否有错误发生
                 if final_state.get("error"):
                     print(f"\n🛑 流程因节点错误中止: {final_state['error']}")
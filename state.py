@@ -1,7 +1,22 @@
 from typing import TypedDict, List, Dict, Any, Annotated
 import operator
 
-class AgentState(TypedDict):
+def merge_errors(left: str, right: str) -> str:
+    """
+    合并错误信息：并行节点同时报错时拼接保留，而不是相互覆盖
+    写入空字符串表示清除错误 (如风险审核通过后)
+    """
+    if right is None:
+        return left
+    if not right or not left or left == right:
+        return right
+    return f"{left}; {right}"
+
+class AgentState(TypedDict, total=False):
+    """
+    图状态 (纯 TypedDict，运行时不做校验)
+    total=False：各节点只返回自己更新的字段，初始输入也无需提供全部键
+    """
     # 基本信息
     stock_code: str
     stock_name: str
@@ -12,6 +27,7 @@ class AgentState(TypedDict):
     # 数据层
     news_items: List[Dict[str, Any]] # 原始新闻列表
     news_analysis: str # LLM 对新闻的分析摘要
+    news_parse_success: bool # 新闻分析结果是否成功解析为 JSON
     sentiment_score: float # -1 to 1
     quant_data: Dict[str, Any]
     technical_indicators: Dict[str, Any]
@@ -27,7 +43,8 @@ class AgentState(TypedDict):
     revision_needed: bool
     human_approval: bool # 人工审核状态
     count: int # 记录循环次数防止死循环
+    interrupted: bool # 流程是否被中断
     is_web_mode: bool # 是否为网页模式
     reasoning_content: Annotated[List[Dict[str, str]], operator.add] # 存储各 Agent 的思考过程
     config: Dict[str, Any] # 存储每个用户独立的 API 和模型配置
-    error: str # 存储节点错误信息，用于中止流程
+    error: Annotated[str, merge_errors] # 存储节点错误信息，用于中止流程
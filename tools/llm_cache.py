@@ -0,0 +1,142 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import orjson
+from langchain_core.messages import AIMessage
+
+
+class AnalysisCache:
+    """
+    LLM 分析结果缓存
+    以 (Agent 名称, 模型配置, 完整提示词) 为键，相同输入直接复用上次的模型输出，跳过整次 LLM 调用
+    内存中保留最近使用的 max_entries 条 (LRU)，同时持久化到 SQLite (WAL 模式) 供跨进程复用；
+    每条记录带有 Agent 代码版本与写入时间，代码变更或超过 ttl_seconds 后旧结果自动失效
+    """
+    def __init__(self, db_path: str = os.path.join(".cache", "analysis.db"), max_entries: int = 128,
+                 ttl_seconds: int = 6 * 3600):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # 连接在多个线程间共享，所有访问都在 self._lock 内进行
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_cache ("
+            "key TEXT PRIMARY KEY, agent TEXT, version TEXT, result BLOB, ts INTEGER)"
+        )
+        # 启动时顺带清理已过期的记录
+        self._conn.execute("DELETE FROM analysis_cache WHERE ts < ?", (int(time.time()) - ttl_seconds,))
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(agent: str, prompt: str, llm_kwargs: Dict[str, Any]) -> str:
+        """生成缓存键 (不包含 api_key)"""
+        model_config = {k: v for k, v in llm_kwargs.items() if k != "api_key"}
+        payload = orjson.dumps([agent, model_config, prompt], option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key: str, version: str = "") -> Optional[Dict[str, str]]:
+        min_ts = int(time.time()) - self.ttl_seconds
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == version and cached[1] >= min_ts:
+                self._entries.move_to_end(key)
+                return cached[2]
+            try:
+                row = self._conn.execute(
+                    "SELECT result, ts FROM analysis_cache WHERE key = ? AND version = ? AND ts >= ?",
+                    (key, version, min_ts)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ 读取分析缓存失败: {e}")
+                return None
+        if row is None:
+            return None
+        try:
+            entry = pickle.loads(row[0])
+        except Exception as e:
+            print(f"⚠️ 读取分析缓存失败: {e}")
+            return None
+        self._remember(key, version, row[1], entry)
+        return entry
+
+    def set(self, key: str, agent: str, entry: Dict[str, str], version: str = ""):
+        ts = int(time.time())
+        self._remember(key, version, ts, entry)
+        blob = pickle.dumps(entry, protocol=5)
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, agent, version, result, ts) VALUES (?, ?, ?, ?, ?)",
+                    (key, agent, version, blob, ts)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ 保存分析缓存失败: {e}")
+
+    def _remember(self, key: str, version: str, ts: int, entry: Dict[str, str]):
+        with self._lock:
+            self._entries[key] = (version, ts, entry)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# 全局缓存实例
+_analysis_cache = AnalysisCache()
+
+@lru_cache(maxsize=None)
+def source_version(module_name: str) -> str:
+    """模块源码的摘要，作为缓存版本号：Agent 代码变更后旧的分析结果不再命中"""
+    try:
+        source = inspect.getsource(sys.modules[module_name])
+    except (KeyError, OSError, TypeError):
+        return ""
+    return hashlib.blake2b(source.encode("utf-8"), digest_size=8).hexdigest()
+
+def cached_llm_invoke(agent: str, llm, prompt: str, llm_kwargs: Dict[str, Any], version: str = "",
+                      store: bool = True) -> AIMessage:
+    """
+    带缓存的 llm.invoke(prompt)
+    命中时返回由缓存内容重建的 AIMessage (content 与 reasoning_content)，调用方无需区分
+    version: 调用方代码版本 (见 source_version)，版本不一致的缓存记录视为未命中
+    store: 为 False 时不立即写入缓存，由调用方在结果解析成功后调用 store_llm_result，
+           避免无法解析的回复在之后的每次运行中被重复使用
+    """
+    key = _analysis_cache.make_key(agent, prompt, llm_kwargs)
+    entry = _analysis_cache.get(key, version)
+    if entry is not None:
+        print(f"✅ {agent} 使用分析缓存")
+        return AIMessage(
+            content=entry["content"],
+            additional_kwargs={"reasoning_content": entry["reasoning"]},
+            response_metadata={"from_cache": True}
+        )
+
+    res = llm.invoke(prompt)
+    if store:
+        store_llm_result(agent, prompt, llm_kwargs, res, version)
+    return res
+
+def store_llm_result(agent: str, prompt: str, llm_kwargs: Dict[str, Any], res: AIMessage, version: str = ""):
+    """将 cached_llm_invoke(store=False) 得到的回复写入缓存；空回复与本身来自缓存的回复不写入"""
+    if not res.content or getattr(res, "response_metadata", {}).get("from_cache"):
+        return
+    key = _analysis_cache.make_key(agent, prompt, llm_kwargs)
+    _analysis_cache.set(key, agent, {
+        "content": res.content,
+        "reasoning": res.additional_kwargs.get("reasoning_content", "")
+    }, version)
@@ -1,182 +1,419 @@
 import akshare as ak
+import asyncio
 import pandas as pd
 from datetime import datetime, timedelta
 import time
+import random
 from functools import wraps, lru_cache
-import json
+import orjson
+import pyarrow as pa
 import os
 import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Callable, Optional, Dict, Union
 
-def retry(max_retries=3, delay=1, backoff=2):
+def retry(max_retries=3, delay=1, backoff=2, max_delay=10, max_total_delay=30):
     """
     重试装饰器，用于 AkShare 接口请求
+    指数退避并加入随机抖动 (0.5~1.5 倍)，避免多个请求同时重试；
+    单次等待不超过 max_delay 秒，累计等待超过 max_total_delay 秒时不再重试
     """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             retries = 0
             current_delay = delay
+            total_delay = 0.0
             while retries < max_retries:
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
                     retries += 1
-                    if retries == max_retries:
+                    sleep_time = current_delay * (0.5 + random.random())
+                    if retries == max_retries or total_delay + sleep_time > max_total_delay:
                         print(f"❌ {func.__name__} 达到最大重试次数: {e}")
                         raise e
-                    print(f"⚠️ {func.__name__} 请求失败 (第 {retries} 次): {e}, {current_delay}s 后重试...")
-                    time.sleep(current_delay)
-                    current_delay *= backoff
+                    print(f"⚠️ {func.__name__} 请求失败 (第 {retries} 次): {e}, {sleep_time:.1f}s 后重试...")
+                    time.sleep(sleep_time)
+                    total_delay += sleep_time
+                    current_delay = min(current_delay * backoff, max_delay)
             return None
         return wrapper
     return decorator
 
+def _json_default(obj):
+    """JSON 序列化兜底：pd.Timestamp 等时间转为 ISO 字符串，其余 numpy 标量转为原生类型，再不行转为字符串"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+def _dump_json(obj: Any) -> bytes:
+    """使用 orjson 序列化 (原生支持 datetime 与 numpy 类型)"""
+    return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
 class TTLCache:
     """
     文件持久化的 TTL 缓存
+    索引文件只记录每个 key 的时间戳与数据文件；DataFrame 以 Feather 格式按 key 单独存储，
+    其余数据以 zstd 压缩的 JSON 存储，命中时才从磁盘加载对应数据
     """
-    def __init__(self, cache_file: str = ".akshare_cache.json"):
-        self.cache_file = cache_file
-        self.cache = self._load_cache()
+    def __init__(self, cache_dir: str = ".akshare_cache", max_payloads: int = 128):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_file = os.path.join(cache_dir, "cache_index.json")
+        # 启动时只加载小体积的索引，数据在首次命中时才反序列化
+        self.index = self._load_index()
+        # 最近使用过的数据 (LRU)，避免重复读盘，同时限制内存占用
+        self.max_payloads = max_payloads
+        self._payloads: OrderedDict = OrderedDict()
+        # 保护索引与 LRU 的并发修改，避免多线程同时写入导致索引损坏
+        self._lock = threading.RLock()
+        # 索引文件的落盘单独加锁：读缓存的线程只需 _lock，不会等待磁盘写入
+        self._write_lock = threading.Lock()
+        # 索引的修改次数与已落盘的版本，避免较旧的快照覆盖较新的索引文件
+        self._index_version = 0
+        self._written_version = 0
+        # 正在进行中的请求 (key -> 等待事件与结果)，用于合并同一 key 的并发未命中
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        # 启动时清理一次：过期条目、无索引引用的数据文件以及旧版单文件缓存
+        self._cleanup_on_startup()
+    
+    # 未记录 ttl 的条目在启动清理时按此时长判断是否过期 (大于所有接口的缓存时间)
+    DEFAULT_PRUNE_TTL = 24 * 3600
+    # 无索引引用的数据文件超过此时长才删除，避免误删其他进程刚写入、尚未登记到索引的文件
+    ORPHAN_GRACE_SECONDS = 3600
+    
+    def _cleanup_on_startup(self):
+        """删除过期条目与孤立数据文件，并移除旧版本的 .akshare_cache.json"""
+        legacy_file = os.path.normpath(self.cache_dir) + ".json"
+        try:
+            if os.path.exists(legacy_file):
+                os.remove(legacy_file)
+        except OSError as e:
+            print(f"⚠️ 删除旧版缓存文件失败: {e}")
+        
+        now = time.time()
+        expired_keys = [
+            key for key, entry in self.index.items()
+            if now - entry.get('ts', 0) > entry.get('ttl', self.DEFAULT_PRUNE_TTL)
+        ]
+        for key in expired_keys:
+            self._remove_entry(key)
+        
+        referenced = {entry.get('payload_path') for entry in self.index.values()}
+        referenced.add(os.path.basename(self.cache_file))
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name in referenced or name.endswith('.tmp'):
+                continue
+            try:
+                if now - os.path.getmtime(path) > self.ORPHAN_GRACE_SECONDS:
+                    os.remove(path)
+            except OSError:
+                pass
+        
+        if expired_keys:
+            self._save_index()
     
-    def _load_cache(self) -> Dict[str, Any]:
-        """加载缓存文件"""
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """加载缓存索引"""
         if os.path.exists(self.cache_file):
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                
-                # 处理 DataFrame 反序列化
-                deserialized_cache = {}
-                for key, entry in cache_data.items():
-                    deserialized_entry = {}
-                    for k, v in entry.items():
-                        if k == 'data' and isinstance(v, dict) and v.get('type') == 'DataFrame':
-                            # 将字典转换回 DataFrame
-                            df_data = v.get('data', [])
-                            # 将 ISO 格式字符串转换回 Timestamp
-                            processed_data = []
-                            for row in df_data:
-                                processed_row = {}
-                                for col_key, col_value in row.items():
-                                    # 尝试将字符串转换为 Timestamp
-                                    if isinstance(col_value, str):
-                                        try:
-                                            # 尝试解析为日期时间
-                                            processed_row[col_key] = pd.to_datetime(col_value)
-                                        except:
-                                            # 如果解析失败，保持原样
-                                            processed_row[col_key] = col_value
-                                    else:
-                                        processed_row[col_key] = col_value
-                                processed_data.append(processed_row)
-                            
-                            deserialized_entry[k] = pd.DataFrame(processed_data)
-                        else:
-                            deserialized_entry[k] = v
-                    deserialized_cache[key] = deserialized_entry
-                
-                return deserialized_cache
+                with open(self.cache_file, 'rb') as f:
+                    return orjson.loads(f.read())
             except Exception as e:
-                print(f"⚠️ 加载缓存文件失败: {e}")
-                return {}
+                print(f"⚠️ 加载缓存索引失败: {e}")
         return {}
     
-    def _save_cache(self):
-        """保存缓存到文件"""
+    @staticmethod
+    def _tmp_path(path: str) -> str:
+        """生成同目录下的临时文件名（按进程与线程区分，避免并发写入冲突）"""
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    
+    def _atomic_write(self, path: str, content: bytes, fsync: bool = False):
+        """先写临时文件再 rename，保证读到的文件总是完整的"""
+        tmp_path = self._tmp_path(path)
         try:
-            # 处理 DataFrame 序列化
-            serializable_cache = {}
-            for key, entry in self.cache.items():
-                serializable_entry = {}
-                for k, v in entry.items():
-                    if k == 'data':
-                        # 如果是 DataFrame，转换为字典
-                        if isinstance(v, pd.DataFrame):
-                            # 转换为字典并处理 Timestamp 对象
-                            df_dict = v.to_dict(orient='records')
-                            # 将 Timestamp 对象转换为字符串
-                            serializable_dict = []
-                            for row in df_dict:
-                                serializable_row = {}
-                                for col_key, col_value in row.items():
-                                    if isinstance(col_value, pd.Timestamp):
-                                        serializable_row[col_key] = col_value.isoformat()
-                                    elif hasattr(col_value, '__iter__') and not isinstance(col_value, (str, bytes)):
-                                        # 处理包含 Timestamp 的列表或其他可迭代对象
-                                        serializable_row[col_key] = str(col_value)
-                                    else:
-                                        serializable_row[col_key] = col_value
-                                serializable_dict.append(serializable_row)
-                            
-                            serializable_entry[k] = {
-                                'type': 'DataFrame',
-                                'data': serializable_dict
-                            }
-                        else:
-                            serializable_entry[k] = v
-                    else:
-                        serializable_entry[k] = v
-                serializable_cache[key] = serializable_entry
-            
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(serializable_cache, f, ensure_ascii=False, indent=2)
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def _save_index(self):
+        """
+        保存缓存索引（索引只含时间戳与文件名，体积很小）
+        只在 _lock 内复制索引，序列化与 fsync 在 _lock 外、由 _write_lock 串行执行；调用方不应持有 _lock
+        """
+        with self._lock:
+            self._index_version += 1
+            version = self._index_version
+            snapshot = dict(self.index)
+        try:
+            content = _dump_json(snapshot)
+            with self._write_lock:
+                # 已有更新的快照落盘时跳过
+                if version < self._written_version:
+                    return
+                self._atomic_write(self.cache_file, content, fsync=True)
+                self._written_version = version
+        except Exception as e:
+            print(f"⚠️ 保存缓存索引失败: {e}")
+    
+    @staticmethod
+    def _encode_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        将 Feather 无法写入的 DataFrame 转换为可 JSON 序列化的结构
+        按列存储 (列名只保存一次)，日期列整列转换为纳秒时间戳，并记录各列 dtype 以便还原
+        """
+        datetime_columns = {}
+        data = []
+        for pos, (_, col) in enumerate(df.items()):
+            if pd.api.types.is_datetime64_any_dtype(col):
+                tz = col.dt.tz
+                if tz is not None:
+                    col = col.dt.tz_convert('UTC').dt.tz_localize(None)
+                # NaT 对应 int64 最小值，读取时 to_datetime 会还原为 NaT
+                datetime_columns[pos] = str(tz) if tz is not None else None
+                data.append(col.to_numpy(dtype='datetime64[ns]').view('int64').tolist())
+                continue
+            if col.dtype == object:
+                # 列表等可迭代对象无法还原为原类型，保持与旧版本一致转为字符串
+                col = col.map(lambda v: str(v) if hasattr(v, '__iter__') and not isinstance(v, (str, bytes)) else v)
+            data.append(col.tolist())
+        return {
+            'type': 'DataFrame',
+            'columns': list(df.columns),
+            'dtypes': [str(dtype) for dtype in df.dtypes],
+            'datetime_columns': [[pos, tz] for pos, tz in datetime_columns.items()],
+            'data': data
+        }
+    
+    @staticmethod
+    def _decode_dataframe(payload: Dict[str, Any]) -> pd.DataFrame:
+        """将 _encode_dataframe 生成的按列结构还原为 DataFrame"""
+        # 按列存储：日期列以列位置记录，避免列名重复或非字符串时对不上
+        df = pd.DataFrame(dict(enumerate(payload['data'])))
+        datetime_positions = set()
+        for pos, tz in payload['datetime_columns']:
+            datetime_positions.add(pos)
+            if tz is None:
+                df[pos] = pd.to_datetime(df[pos], unit='ns')
+            else:
+                df[pos] = pd.to_datetime(df[pos], unit='ns', utc=True).dt.tz_convert(tz)
+        # 其余列按记录的 dtype 还原 (如全空的 float 列)，无法转换的保持原样
+        for pos, dtype in enumerate(payload['dtypes']):
+            if pos in datetime_positions or dtype == 'object' or str(df[pos].dtype) == dtype:
+                continue
+            try:
+                df[pos] = df[pos].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+        df.columns = payload['columns']
+        return df
+    
+    def _write_payload(self, key: str, data: Any) -> tuple:
+        """将单条缓存数据写入独立文件，返回 (文件名, 数据类型)"""
+        if isinstance(data, pd.DataFrame):
+            path = os.path.join(self.cache_dir, f"{key}.feather")
+            tmp_path = self._tmp_path(path)
+            try:
+                data.reset_index(drop=True).to_feather(tmp_path, compression='zstd')
+                os.replace(tmp_path, path)
+                return os.path.basename(path), 'feather'
+            except Exception as e:
+                # 列名非字符串、object 列混合类型等情况无法写入 Feather，退回 JSON
+                print(f"⚠️ Feather 写入失败，改用 JSON 存储: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                payload, kind = self._encode_dataframe(data), 'dataframe'
+        else:
+            payload, kind = data, 'json'
+        
+        # JSON 数据使用 zstd 压缩 (与 Feather 相同的编解码器，由 pyarrow 提供)
+        path = os.path.join(self.cache_dir, f"{key}.json.zst")
+        sink = pa.BufferOutputStream()
+        with pa.CompressedOutputStream(sink, 'zstd') as stream:
+            stream.write(_dump_json(payload))
+        self._atomic_write(path, sink.getvalue().to_pybytes())
+        return os.path.basename(path), kind
+    
+    def _remember(self, key: str, data: Any):
+        """将数据放入内存 LRU，超出容量时淘汰最久未使用的一条"""
+        with self._lock:
+            self._payloads[key] = data
+            self._payloads.move_to_end(key)
+            if len(self._payloads) > self.max_payloads:
+                self._payloads.popitem(last=False)
+    
+    def _load_payload(self, key: str, entry: Dict[str, Any]) -> Optional[Any]:
+        """按需加载单条缓存数据"""
+        with self._lock:
+            if key in self._payloads:
+                self._payloads.move_to_end(key)
+                return self._payloads[key]
+        
+        path = os.path.join(self.cache_dir, entry['payload_path'])
+        try:
+            if entry['payload_kind'] == 'feather':
+                data = pd.read_feather(path)
+            else:
+                with pa.input_stream(path, compression='zstd') as f:
+                    data = orjson.loads(f.read())
+                if entry['payload_kind'] == 'dataframe':
+                    data = self._decode_dataframe(data)
         except Exception as e:
-            print(f"⚠️ 保存缓存文件失败: {e}")
+            print(f"⚠️ 读取缓存数据失败: {e}")
+            return None
+        
+        self._remember(key, data)
+        return data
+    
+    def _remove_entry(self, key: str):
+        """删除索引项及其数据文件"""
+        with self._lock:
+            entry = self.index.pop(key, None)
+            self._payloads.pop(key, None)
+        if entry and entry.get('payload_path'):
+            try:
+                os.remove(os.path.join(self.cache_dir, entry['payload_path']))
+            except FileNotFoundError:
+                pass
+    
+    @staticmethod
+    def _is_plain_str(value: Any) -> bool:
+        return isinstance(value, str) and 0 < len(value) <= 32 and value.isascii() and value.isalnum()
     
     def _generate_key(self, func_name: str, args: tuple, kwargs: dict) -> str:
-        """生成缓存键"""
-        key_parts = [func_name]
-        key_parts.extend([str(arg) for arg in args])
-        key_parts.extend([f"{k}={v}" for k, v in sorted(kwargs.items())])
-        key_string = "|".join(key_parts)
-        return hashlib.md5(key_string.encode('utf-8')).hexdigest()
+        """
+        生成缓存键
+        常见调用 (股票代码等简单字符串位置参数 + 整数关键字参数) 直接拼接为可读的文件名，
+        其余情况对带类型信息的参数序列做 blake2b 摘要，避免 str(True) 与 "True" 之类的冲突
+        """
+        if (all(self._is_plain_str(arg) for arg in args)
+                and all(type(v) is int for v in kwargs.values())):
+            key_parts = [func_name, *args]
+            key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
+            return "-".join(key_parts)
+        payload = _dump_json([func_name, list(args), sorted(kwargs.items())])
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _format_ts(ts: float) -> str:
+        """将写入时间 (epoch 秒) 格式化为展示用的 ISO 字符串"""
+        return datetime.fromtimestamp(ts).isoformat()
     
-    def get(self, func_name: str, args: tuple, kwargs: dict) -> Optional[Any]:
-        """获取缓存"""
+    def get(self, func_name: str, args: tuple, kwargs: dict, ttl_seconds: Optional[int] = None) -> Optional[Any]:
+        """
+        获取缓存
+        传入 ttl_seconds 时先根据索引中的时间戳判断是否过期，过期数据不会被反序列化
+        """
         key = self._generate_key(func_name, args, kwargs)
-        if key in self.cache:
-            entry = self.cache[key]
-            if 'data' in entry and 'timestamp' in entry:
-                return entry['data'], entry['timestamp']
+        with self._lock:
+            entry = self.index.get(key)
+        # 索引只记录 epoch 时间戳 'ts'，没有该字段的旧条目视为过期
+        if entry and 'ts' in entry and 'payload_path' in entry:
+            if ttl_seconds is not None and time.time() - entry['ts'] >= ttl_seconds:
+                return None, None
+            data = self._load_payload(key, entry)
+            if data is not None:
+                return data, self._format_ts(entry['ts'])
         return None, None
     
-    def set(self, func_name: str, args: tuple, kwargs: dict, data: Any):
-        """设置缓存"""
+    def set(self, func_name: str, args: tuple, kwargs: dict, data: Any, ttl_seconds: Optional[int] = None):
+        """设置缓存 (ttl_seconds 记录在索引中，供启动时清理过期条目)"""
         key = self._generate_key(func_name, args, kwargs)
-        self.cache[key] = {
-            'data': data,
-            'timestamp': datetime.now().isoformat(),
-            'function': func_name
-        }
-        self._save_cache()
+        try:
+            payload_path, payload_kind = self._write_payload(key, data)
+        except Exception as e:
+            print(f"⚠️ 保存缓存数据失败: {e}")
+            return
+        # 数据文件已在锁外写完，这里只更新索引，索引文件在锁外原子替换
+        with self._lock:
+            previous = self.index.get(key)
+            self.index[key] = {
+                'ts': time.time(),
+                'function': func_name,
+                'payload_path': payload_path,
+                'payload_kind': payload_kind
+            }
+            if ttl_seconds is not None:
+                self.index[key]['ttl'] = ttl_seconds
+            self._remember(key, data)
+        self._save_index()
+        # 数据类型变化 (如 Feather 写入失败改用 JSON) 时，旧数据文件不再被引用，直接删除
+        if previous and previous.get('payload_path') and previous['payload_path'] != payload_path:
+            try:
+                os.remove(os.path.join(self.cache_dir, previous['payload_path']))
+            except OSError:
+                pass
+    
+    def singleflight(self, func_name: str, args: tuple, kwargs: dict, loader: Callable[[], Any],
+                     ttl_seconds: Optional[int] = None) -> Any:
+        """
+        同一 key 的并发未命中只执行一次 loader，其余线程等待并共享其结果 (或异常)
+        只在登记/注销时持锁，loader 本身在锁外执行，不阻塞其他 key
+        传入 ttl_seconds 时，成为执行者后会先再查一次缓存：上一轮执行者可能刚写入缓存并注销，
+        此时直接使用缓存结果，不再重复调用 loader
+        """
+        key = self._generate_key(func_name, args, kwargs)
+        with self._lock:
+            flight = self._inflight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = {'event': threading.Event(), 'result': None, 'error': None}
+                self._inflight[key] = flight
+        
+        if not is_leader:
+            flight['event'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['result']
+        
+        try:
+            cached_data = None
+            if ttl_seconds is not None:
+                cached_data, _ = self.get(func_name, args, kwargs, ttl_seconds)
+            flight['result'] = cached_data if cached_data is not None else loader()
+            return flight['result']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight['event'].set()
     
     def clear_expired(self, ttl_seconds: int):
         """清理过期缓存"""
-        current_time = datetime.now()
-        expired_keys = []
-        for key, entry in self.cache.items():
-            if 'timestamp' in entry:
-                try:
-                    cache_time = datetime.fromisoformat(entry['timestamp'])
-                    if (current_time - cache_time).total_seconds() > ttl_seconds:
-                        expired_keys.append(key)
-                except:
-                    expired_keys.append(key)
+        now = time.time()
+        with self._lock:
+            expired_keys = [
+                key for key, entry in self.index.items()
+                if now - entry.get('ts', 0) > ttl_seconds
+            ]
         
         for key in expired_keys:
-            del self.cache[key]
+            self._remove_entry(key)
         
         if expired_keys:
-            self._save_cache()
+            self._save_index()
             print(f"✅ 清理了 {len(expired_keys)} 条过期缓存")
     
     def get_last_updated(self, func_name: str, args: tuple, kwargs: dict) -> Optional[str]:
         """获取最后更新时间"""
         key = self._generate_key(func_name, args, kwargs)
-        if key in self.cache and 'timestamp' in self.cache[key]:
-            return self.cache[key]['timestamp']
+        entry = self.index.get(key)
+        if entry and 'ts' in entry:
+            return self._format_ts(entry['ts'])
         return None
 
 # 全局缓存实例
@@ -192,26 +429,25 @@ def ttl_cache(ttl_seconds: int = 300):
         
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # 尝试从缓存获取
-            cached_data, timestamp = _cache_instance.get(func_name, args, kwargs)
+            # 尝试从缓存获取 (已过期的条目直接视为未命中)
+            cached_data, timestamp = _cache_instance.get(func_name, args, kwargs, ttl_seconds)
             
             if cached_data is not None:
-                try:
-                    cache_time = datetime.fromisoformat(timestamp)
-                    if (datetime.now() - cache_time).total_seconds() < ttl_seconds:
-                        print(f"✅ {func_name} 使用缓存 (更新于: {timestamp})")
-                        return cached_data
-                except Exception as e:
-                    print(f"⚠️ 缓存时间解析失败: {e}")
+                print(f"✅ {func_name} 使用缓存 (更新于: {timestamp})")
+                return cached_data
             
-            # 缓存未命中或已过期，调用原函数
-            result = func(*args, **kwargs)
-            
-            # 保存到缓存
-            if result is not None:
-                _cache_instance.set(func_name, args, kwargs, result)
+            def load():
+                # 缓存未命中或已过期，调用原函数
+                result = func(*args, **kwargs)
+                
+                # 保存到缓存
+                if result is not None:
+                    _cache_instance.set(func_name, args, kwargs, result, ttl_seconds)
+                
+                return result
             
-            return result
+            # 并发的相同请求只会真正调用一次原函数
+            return _cache_instance.singleflight(func_name, args, kwargs, load, ttl_seconds)
         
         # 添加获取最后更新时间的方法
         wrapper.get_last_updated = lambda *args, **kwargs: _cache_instance.get_last_updated(func_name, args, kwargs)
@@ -219,6 +455,39 @@ def ttl_cache(ttl_seconds: int = 300):
         return wrapper
     return decorator
 
+def _memo_with_ttl(ttl_seconds: int = 3600, maxsize: int = 4096):
+    """
+    进程内 TTL 缓存装饰器，适用于返回值很小的查询函数 (不落盘、不序列化)
+    字符串参数去除首尾空白后作为缓存键；超出 maxsize 时淘汰最久未使用的条目
+    """
+    def decorator(func: Callable) -> Callable:
+        entries: OrderedDict = OrderedDict()
+        lock = threading.Lock()
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            args = tuple(arg.strip() if isinstance(arg, str) else arg for arg in args)
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.time()
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and now - entry[0] < ttl_seconds:
+                    entries.move_to_end(key)
+                    return entry[1]
+            
+            result = func(*args, **kwargs)
+            if result is not None:
+                with lock:
+                    entries[key] = (now, result)
+                    entries.move_to_end(key)
+                    if len(entries) > maxsize:
+                        entries.popitem(last=False)
+            return result
+        
+        wrapper.cache_clear = entries.clear
+        return wrapper
+    return decorator
+
 def clear_akshare_cache(ttl_seconds: int = 300):
     """清理过期的 AkShare 缓存"""
     _cache_instance.clear_expired(ttl_seconds)
@@ -230,14 +499,14 @@ def get_cache_status(stock_code: str = None) -> Dict[str, Any]:
     """
     cache_info = {
         "cache_file": _cache_instance.cache_file,
-        "cache_size": len(_cache_instance.cache),
+        "cache_size": len(_cache_instance.index),
         "data_sources": {}
     }
     
     if stock_code:
         # 获取特定股票的缓存状态
         cache_info["data_sources"]["股票历史数据"] = {
-            "last_updated": get_stock_hist_data.get_last_updated(stock_code),
+            "last_updated": _get_stock_hist_full.get_last_updated(stock_code),
             "function": "get_stock_hist_data"
         }
         cache_info["data_sources"]["财务指标"] = {
@@ -265,26 +534,35 @@ def get_cache_status(stock_code: str = None) -> Dict[str, Any]:
 
 @ttl_cache(ttl_seconds=600)
 @retry()
-def get_stock_hist_data(stock_code: str, days: int = 150):
+def _get_stock_hist_full(stock_code: str):
     """
-    获取股票历史 K 线数据 (AkShare)
-    为保证技术指标（如 MA60）计算准确，默认获取 150 天数据
+    获取股票完整历史 K 线数据 (已解析日期并按日期递增排序)
+    缓存键不含 days，不同 days 的调用共用同一份数据
     缓存时间: 10 分钟
     """
     try:
-        # 获取足够的历史数据以支持指标计算
         df = ak.stock_zh_a_hist(symbol=stock_code, period="daily", adjust="qfq")
         if not df.empty:
             df['日期'] = pd.to_datetime(df['日期'])
             # 排序确保日期递增
-            df = df.sort_values('日期')
-            # 仅截取最近的 N 天用于返回，但保留足够的历史记录供计算
-            return df.tail(days)
+            return df.sort_values('日期').reset_index(drop=True)
         return pd.DataFrame()
     except Exception as e:
         print(f"获取历史数据失败: {e}")
         return pd.DataFrame()
 
+def get_stock_hist_data(stock_code: str, days: int = 150):
+    """
+    获取股票历史 K 线数据 (AkShare)
+    为保证技术指标（如 MA60）计算准确，默认获取 150 天数据
+    完整历史由 _get_stock_hist_full 缓存，这里只截取最近的 N 天
+    """
+    df = _get_stock_hist_full(stock_code)
+    if df is None or df.empty:
+        return pd.DataFrame()
+    # 返回副本，避免调用方修改共享的缓存数据
+    return df.tail(days).copy()
+
 @ttl_cache(ttl_seconds=1800)
 @retry()
 def get_stock_financial_indicator(stock_code: str):
@@ -302,6 +580,14 @@ def get_stock_financial_indicator(stock_code: str):
         print(f"获取财务指标失败: {e}")
         return {}
 
+# 新闻字段的候选列名 (按优先级)，不同版本的 AkShare 接口列名可能不同
+_NEWS_ALIASES = {
+    "新闻标题": ("新闻标题", "title", "标题"),
+    "发布时间": ("发布时间", "time", "date", "时间"),
+    "新闻内容": ("新闻内容", "content", "内容"),
+    "文章链接": ("文章链接", "url", "link", "链接"),
+}
+
 @ttl_cache(ttl_seconds=300)
 @retry()
 def get_stock_news(stock_code: str, with_sector: bool = True):
@@ -314,20 +600,12 @@ def get_stock_news(stock_code: str, with_sector: bool = True):
         
         final_news = []
         if not df.empty:
-            available_cols = df.columns.tolist()
-            mapping = {
-                "新闻标题": ["新闻标题", "title", "标题"],
-                "发布时间": ["发布时间", "time", "date", "时间"],
-                "新闻内容": ["新闻内容", "content", "内容"],
-                "文章链接": ["文章链接", "url", "link", "链接"]
-            }
-            
+            available_cols = set(df.columns)
             final_mapping = {}
-            for key, possible_names in mapping.items():
-                for name in possible_names:
-                    if name in available_cols:
-                        final_mapping[key] = name
-                        break
+            for key, possible_names in _NEWS_ALIASES.items():
+                name = next((n for n in possible_names if n in available_cols), None)
+                if name is not None:
+                    final_mapping[key] = name
             
             if "新闻标题" in final_mapping:
                 df_selected = df[list(final_mapping.values())].head(15)
@@ -374,6 +652,25 @@ def get_stock_report(stock_code: str):
         print(f"获取盈利预测失败: {e}")
         return []
 
+@ttl_cache(ttl_seconds=300)
+@retry()
+def _get_fund_flow_rank_df():
+    """
+    获取全市场资金流向排名 (AkShare - 东方财富排名接口)
+    各股票共用同一份排名表，缓存时间: 5 分钟
+    """
+    return ak.stock_individual_fund_flow_rank()
+
+# 资金流向排名表按代码建立的索引，排名表对象变化 (缓存刷新) 时才重建
+_fund_flow_index: Dict[str, Any] = {"source": None, "index": None}
+
+def _get_fund_flow_index(df: pd.DataFrame) -> pd.DataFrame:
+    """返回以 "代码" 为索引的排名表，用于按代码做哈希查找"""
+    if _fund_flow_index["source"] is not df:
+        index = df.drop_duplicates(subset="代码").set_index("代码", drop=False)
+        _fund_flow_index.update(source=df, index=index)
+    return _fund_flow_index["index"]
+
 @ttl_cache(ttl_seconds=300)
 @retry()
 def get_stock_fund_flow(stock_code: str):
@@ -384,13 +681,13 @@ def get_stock_fund_flow(stock_code: str):
     缓存时间: 5 分钟
     """
     try:
-        # 获取全市场排名
-        df = ak.stock_individual_fund_flow_rank()
+        # 获取全市场排名 (多只股票共用同一份缓存)
+        df = _get_fund_flow_rank_df()
         if df is not None and not df.empty:
-            # 过滤出当前股票
-            row = df[df["代码"] == stock_code]
-            if not row.empty:
-                result = row.iloc[0].to_dict()
+            # 按代码索引查找当前股票
+            index = _get_fund_flow_index(df)
+            if stock_code in index.index:
+                result = index.loc[stock_code].to_dict()
                 result["数据状态"] = "正常"
                 return result
             else:
@@ -418,25 +715,114 @@ def get_stock_fund_flow(stock_code: str):
             "建议": "建议人工复核资金流向数据"
         }
 
+# 名称列的 名称 -> 行号 索引，按 (表标识, 列名) 缓存，表对象变化 (缓存刷新) 时才重建
+_name_indexes: Dict[tuple, tuple] = {}
+
+def _get_name_index(tag: str, df: pd.DataFrame, column: str) -> tuple:
+    """
+    返回 (名称到首次出现行号的字典, Arrow 字符串类型的名称列)
+    Arrow 字符串列上的 str.contains 走 Arrow 计算内核，而不是逐个调用 Python 字符串方法
+    """
+    cached = _name_indexes.get((tag, column))
+    if cached is None or cached[0] is not df:
+        index: Dict[str, int] = {}
+        names = []
+        for pos, value in enumerate(df[column].tolist()):
+            if isinstance(value, str):
+                index.setdefault(value, pos)
+                names.append(value)
+            else:
+                names.append(None)
+        cached = (df, index, pd.Series(names, dtype='string[pyarrow]'))
+        _name_indexes[(tag, column)] = cached
+    return cached[1], cached[2]
+
+def _find_row_by_name(tag: str, df: pd.DataFrame, column: str, name: str) -> Optional[pd.Series]:
+    """按名称查找行：先查哈希索引做精确匹配，未命中再做子串匹配"""
+    if df is None or df.empty:
+        return None
+    index, names = _get_name_index(tag, df, column)
+    pos = index.get(name)
+    if pos is not None:
+        return df.iloc[pos]
+    matched = names.str.contains(name, regex=False, na=False).to_numpy().nonzero()[0]
+    if len(matched):
+        return df.iloc[matched[0]]
+    return None
+
 @ttl_cache(ttl_seconds=3600)
 @retry()
+def _get_industry_boards_df():
+    """获取行业板块列表，缓存时间: 1 小时"""
+    return ak.stock_board_industry_name_em()
+
+@ttl_cache(ttl_seconds=60)
+@retry()
+def _get_industry_quotes_df():
+    """获取行业板块实时行情 (最新价、涨跌幅、成交额等)，缓存时间: 1 分钟"""
+    return ak.stock_board_industry_name_em()
+
+@ttl_cache(ttl_seconds=3600)
+@retry()
+def _get_concept_boards_df():
+    """获取概念板块列表，缓存时间: 1 小时"""
+    return ak.stock_board_concept_name_em()
+
+# 板块类型 -> (板块列表对象, 索引)，列表对象变化 (缓存刷新) 时才重建
+_board_indexes: Dict[str, tuple] = {}
+
+def _get_board_index(board_type: str = "industry") -> Optional[Dict[str, Any]]:
+    """
+    板块列表的查找索引：按板块名称、板块代码各建一份字典，并保留 Arrow 字符串类型的名称列用于模糊匹配
+    与板块列表的缓存同步：只在拿到新的列表对象时重建
+    """
+    df = _get_industry_boards_df() if board_type == "industry" else _get_concept_boards_df()
+    if df is None or df.empty:
+        return None
+    cached = _board_indexes.get(board_type)
+    if cached is not None and cached[0] is df:
+        return cached[1]
+    rows = df.to_dict(orient="records")
+    by_name: Dict[str, Dict[str, Any]] = {}
+    by_code: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        by_name.setdefault(row.get("板块名称"), row)
+        by_code.setdefault(row.get("板块代码"), row)
+    names = pd.Series([row.get("板块名称") for row in rows], dtype='string[pyarrow]')
+    index = {"rows": rows, "by_name": by_name, "by_code": by_code, "names": names}
+    _board_indexes[board_type] = (df, index)
+    return index
+
+def _find_board(board_type: str, name: str) -> Optional[Dict[str, Any]]:
+    """按板块名称或代码精确查找，未命中再按名称做子串匹配"""
+    index = _get_board_index(board_type)
+    if index is None:
+        return None
+    row = index["by_name"].get(name) or index["by_code"].get(name)
+    if row is not None:
+        return row
+    matched = index["names"].str.contains(name, regex=False, na=False).to_numpy().nonzero()[0]
+    if len(matched):
+        return index["rows"][matched[0]]
+    return None
+
+@_memo_with_ttl(ttl_seconds=3600)
+@retry()
 def search_board_info(name: str):
     """
-    搜索板块信息 (行业或概念)
+    搜索板块信息 (行业或概念)，支持板块名称或板块代码
     缓存时间: 1 小时
     """
     try:
         # 1. 先查行业板块
-        ind_boards = ak.stock_board_industry_name_em()
-        match = ind_boards[ind_boards["板块名称"].str.contains(name, regex=False, na=False)]
-        if not match.empty:
-            return {"name": match.iloc[0]["板块名称"], "code": match.iloc[0]["板块代码"], "type": "industry"}
+        row = _find_board("industry", name)
+        if row is not None:
+            return {"name": row["板块名称"], "code": row["板块代码"], "type": "industry"}
         
         # 2. 再查概念板块
-        con_boards = ak.stock_board_concept_name_em()
-        match = con_boards[con_boards["板块名称"].str.contains(name, regex=False, na=False)]
-        if not match.empty:
-            return {"name": match.iloc[0]["板块名称"], "code": match.iloc[0]["板块代码"], "type": "concept"}
+        row = _find_board("concept", name)
+        if row is not None:
+            return {"name": row["板块名称"], "code": row["板块代码"], "type": "concept"}
             
         return None
     except Exception as e:
@@ -503,29 +889,95 @@ def get_board_news(board_name: str, board_type: str = "industry", with_stock: bo
         if not cons:
             return []
             
-        # 2. 获取前 5 个核心成分股的新闻
+        # 2. 并发获取前 5 个核心成分股的新闻 (结果保持成分股顺序)
+        stock_codes = [stock.get("代码") or stock.get("股票代码") for stock in cons[:5]]
+        stock_codes = [code for code in stock_codes if code]
         all_news = []
-        for stock in cons[:5]:
-            stock_code = stock.get("代码") or stock.get("股票代码")
-            if stock_code:
+        if stock_codes:
+            with ThreadPoolExecutor(max_workers=len(stock_codes)) as executor:
                 # 注意：此处调用 get_stock_news 时必须设置 with_sector=False，防止无限递归
-                news = get_stock_news(stock_code, with_sector=False)
-                if news:
-                    all_news.extend(news[:3]) 
+                for news in executor.map(lambda code: get_stock_news(code, with_sector=False), stock_codes):
+                    if news:
+                        all_news.extend(news[:3])
                  
-        # 去重处理
+        # 去重处理：标题相同或链接相同 (转载) 都视为重复
         unique_news = []
         seen_titles = set()
+        seen_urls = set()
         for item in all_news:
-            if item['新闻标题'] not in seen_titles:
-                unique_news.append(item)
-                seen_titles.add(item['新闻标题'])
+            title = item.get('新闻标题', '')
+            url = (item.get('文章链接') or '')[:80]
+            if title in seen_titles or (url and url in seen_urls):
+                continue
+            unique_news.append(item)
+            seen_titles.add(title)
+            if url:
+                seen_urls.add(url)
                 
         return unique_news[:15]
     except Exception as e:
         print(f"获取板块动态失败: {e}")
         return []
 
+def _industry_summary_ths(board_name: str) -> Optional[Dict[str, Any]]:
+    """行业对比数据源 1: 东方财富行业板块摘要"""
+    try:
+        df = ak.stock_board_industry_summary_ths()
+        if df is not None and not df.empty:
+            df["板块"] = df["板块"].astype('string[pyarrow]')
+            # 尝试精确匹配
+            match = df[df["板块"] == board_name]
+            if match.empty:
+                # 如果精确匹配失败，尝试模糊匹配
+                match = df[df["板块"].str.contains(board_name, regex=False, na=False)]
+            
+            if not match.empty:
+                comparison_data = match.iloc[0].to_dict()
+                comparison_data["数据来源"] = "东方财富"
+                comparison_data["行业名称"] = board_name
+                comparison_data["数据状态"] = "正常"
+                return comparison_data
+    except Exception as e:
+        print(f"⚠️ 东方财富行业数据获取失败: {e}")
+    return None
+
+def _industry_board_em(board_name: str) -> Optional[Dict[str, Any]]:
+    """行业对比数据源 2: 同花顺行业板块数据"""
+    try:
+        # 直接在短缓存的实时列表中按名称匹配 (先精确后子串)，一次调用只请求一次接口
+        row = _find_row_by_name("industry_quotes", _get_industry_quotes_df(), "板块名称", board_name)
+        if row is not None:
+            return {
+                "行业名称": board_name,
+                "板块名称": row["板块名称"],
+                "最新价": row.get("最新价", "N/A"),
+                "涨跌幅": row.get("涨跌幅", "N/A"),
+                "涨跌额": row.get("涨跌额", "N/A"),
+                "成交量": row.get("成交量", "N/A"),
+                "成交额": row.get("成交额", "N/A"),
+                "数据来源": "同花顺",
+                "数据状态": "正常"
+            }
+    except Exception as e:
+        print(f"⚠️ 同花顺行业数据获取失败: {e}")
+    return None
+
+def _industry_cons_em(board_name: str) -> Optional[Dict[str, Any]]:
+    """行业对比数据源 3: 行业内个股排名（作为替代指标）"""
+    try:
+        df = ak.stock_board_industry_cons_em(symbol=board_name)
+        if df is not None and not df.empty:
+            return {
+                "行业名称": board_name,
+                "成分股数量": len(df),
+                "数据来源": "成分股统计",
+                "数据状态": "部分可用",
+                "说明": "仅获取到行业成分股信息，无法获取行业整体指标"
+            }
+    except Exception as e:
+        print(f"⚠️ 行业成分股数据获取失败: {e}")
+    return None
+
 @ttl_cache(ttl_seconds=1800)
 @retry()
 def get_stock_industry_comparison(stock_code: str):
@@ -563,67 +1015,18 @@ def get_stock_industry_comparison(stock_code: str):
             "数据状态": "异常"
         }
 
-    # 尝试多个数据源获取行业对比数据
-    comparison_data = None
-    
-    # 尝试 1: 东方财富行业板块摘要
+    # 三个数据源互不依赖，并发请求后按优先级取第一个可用结果
+    sources = (_industry_summary_ths, _industry_board_em, _industry_cons_em)
+    executor = ThreadPoolExecutor(max_workers=len(sources))
     try:
-        df = ak.stock_board_industry_summary_ths()
-        if df is not None and not df.empty:
-            # 尝试精确匹配
-            match = df[df["板块"] == board_name]
-            if match.empty:
-                # 如果精确匹配失败，尝试模糊匹配
-                match = df[df["板块"].str.contains(board_name, regex=False, na=False)]
-            
-            if not match.empty:
-                comparison_data = match.iloc[0].to_dict()
-                comparison_data["数据来源"] = "东方财富"
-                comparison_data["行业名称"] = board_name
-                comparison_data["数据状态"] = "正常"
+        futures = [executor.submit(source, board_name) for source in sources]
+        for future in futures:
+            comparison_data = future.result()
+            if comparison_data is not None:
                 return comparison_data
-    except Exception as e:
-        print(f"⚠️ 东方财富行业数据获取失败: {e}")
-    
-    # 尝试 2: 同花顺行业板块数据
-    try:
-        df = ak.stock_board_industry_name_em()
-        if df is not None and not df.empty:
-            # 尝试匹配行业名称
-            match = df[df["板块名称"] == board_name]
-            if match.empty:
-                match = df[df["板块名称"].str.contains(board_name, regex=False, na=False)]
-            
-            if not match.empty:
-                comparison_data = {
-                    "行业名称": board_name,
-                    "板块名称": match.iloc[0]["板块名称"],
-                    "最新价": match.iloc[0].get("最新价", "N/A"),
-                    "涨跌幅": match.iloc[0].get("涨跌幅", "N/A"),
-                    "涨跌额": match.iloc[0].get("涨跌额", "N/A"),
-                    "成交量": match.iloc[0].get("成交量", "N/A"),
-                    "成交额": match.iloc[0].get("成交额", "N/A"),
-                    "数据来源": "同花顺",
-                    "数据状态": "正常"
-                }
-                return comparison_data
-    except Exception as e:
-        print(f"⚠️ 同花顺行业数据获取失败: {e}")
-    
-    # 尝试 3: 获取行业内个股排名（作为替代指标）
-    try:
-        df = ak.stock_board_industry_cons_em(symbol=board_name)
-        if df is not None and not df.empty:
-            comparison_data = {
-                "行业名称": board_name,
-                "成分股数量": len(df),
-                "数据来源": "成分股统计",
-                "数据状态": "部分可用",
-                "说明": "仅获取到行业成分股信息，无法获取行业整体指标"
-            }
-            return comparison_data
-    except Exception as e:
-        print(f"⚠️ 行业成分股数据获取失败: {e}")
+    finally:
+        # 已拿到结果时不再等待优先级更低的数据源
+        executor.shutdown(wait=False, cancel_futures=True)
     
     # 所有尝试都失败，返回基本信息
     print(f"⚠️ 所有行业对比数据源均不可用")
@@ -637,18 +1040,86 @@ def get_stock_industry_comparison(stock_code: str):
 
 @ttl_cache(ttl_seconds=3600)
 @retry()
+def _get_stock_spot_df():
+    """获取 A 股实时行情列表 (用于名称检索)，缓存时间: 1 小时"""
+    return ak.stock_zh_a_spot_em()
+
+@_memo_with_ttl(ttl_seconds=3600)
+@retry()
 def search_stock_code(stock_name: str):
     """
     通过股票名称搜索股票代码 (AkShare)
     缓存时间: 1 小时
     """
     try:
-        df = ak.stock_zh_a_spot_em()
-        if not df.empty:
-            match = df[df["名称"].str.contains(stock_name, regex=False, na=False)]
-            if not match.empty:
-                return match.iloc[0]["代码"], match.iloc[0]["名称"]
+        row = _find_row_by_name("stock_spot", _get_stock_spot_df(), "名称", stock_name)
+        if row is not None:
+            return row["代码"], row["名称"]
         return None, None
     except Exception as e:
         print(f"搜索股票代码失败: {e}")
         return None, None
+
+# 后台预取使用的线程池 (进程内共享)
+_prefetch_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="akshare_prefetch")
+
+def _prefetch_call(func: Callable, args: tuple):
+    try:
+        func(*args)
+    except Exception as e:
+        print(f"⚠️ 预取 {func.__name__} 失败: {e}")
+
+def prefetch_stock_data(stock_code: str, stock_name: str = "", is_sector: bool = False, sector_type: str = "industry") -> list:
+    """
+    在后台预取分析流程会用到的数据，返回 Future 列表 (调用方无需等待)
+    参数形式与各 Agent 节点中的调用保持一致，保证命中同一缓存键；
+    节点在预取完成前发起相同请求时，会通过 singleflight 等待同一次请求的结果
+    """
+    if is_sector:
+        tasks = [(get_board_news, (stock_name, sector_type))]
+    else:
+        tasks = [
+            (get_stock_financial_indicator, (stock_code,)),
+            (get_stock_fund_flow, (stock_code,)),
+            (get_stock_industry_comparison, (stock_code,)),
+            (get_stock_news, (stock_code,)),
+            (get_stock_report, (stock_code,)),
+        ]
+    return [_prefetch_executor.submit(_prefetch_call, func, args) for func, args in tasks]
+
+def _to_async(func: Callable) -> Callable:
+    """将同步数据接口包装为协程：在线程池中执行，缓存/重试逻辑与同步版本一致"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return wrapper
+
+# 批量场景使用的异步版本
+get_stock_hist_data_async = _to_async(get_stock_hist_data)
+get_stock_fund_flow_async = _to_async(get_stock_fund_flow)
+get_stock_news_async = _to_async(get_stock_news)
+get_stock_financial_indicator_async = _to_async(get_stock_financial_indicator)
+
+async def gather_stock_data_async(stock_codes: list, fetcher: Callable = get_stock_hist_data_async,
+                                  max_concurrency: int = 8, **kwargs) -> Dict[str, Any]:
+    """
+    并发获取多只股票的数据，返回 {股票代码: 结果}
+    max_concurrency 限制同时进行的请求数，避免触发数据源限流；单只股票失败时结果为 None
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def fetch(stock_code: str):
+        async with semaphore:
+            try:
+                return await fetcher(stock_code, **kwargs)
+            except Exception as e:
+                print(f"⚠️ 获取 {stock_code} 数据失败: {e}")
+                return None
+    
+    results = await asyncio.gather(*(fetch(code) for code in stock_codes))
+    return dict(zip(stock_codes, results))
+
+def gather_stock_data(stock_codes: list, fetcher: Callable = get_stock_hist_data_async,
+                      max_concurrency: int = 8, **kwargs) -> Dict[str, Any]:
+    """gather_stock_data_async 的同步入口 (不可在已运行的事件循环中调用)"""
+    return asyncio.run(gather_stock_data_async(stock_codes, fetcher, max_concurrency, **kwargs))